@@ -0,0 +1,89 @@
+from contextlib import asynccontextmanager
+from typing import Dict, List, NamedTuple, Optional
+
+import ahocorasick
+from fastapi import APIRouter, FastAPI, HTTPException, Query, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+
+from app.graph import warm_up_model
+from app.utils import build_order_matcher, index_orders, load_json, match_orders, normalize_order_id
+
+# Shared by app.main (REST API) and app.server (REST API + LangServe playground).
+
+class OrderIndex(NamedTuple):
+    orders: List[Dict]
+    by_id: Dict[str, Dict]
+    by_email: Dict[str, List[int]]
+    matcher: Optional[ahocorasick.Automaton]
+
+def build_order_index(orders: List[Dict]) -> OrderIndex:
+    return OrderIndex(orders, *index_orders(orders), build_order_matcher(orders))
+
+def get_order_index(request: Request) -> OrderIndex:
+    """app.state's order indexes, rebuilt whenever load_json re-parses an edited orders.json."""
+    state = request.app.state
+    orders = load_json("orders.json")
+    index = state.order_index
+    if orders is not index.orders:
+        # Swapped in as one tuple, so a concurrent request never sees a half-rebuilt index.
+        index = state.order_index = build_order_index(orders)
+    return index
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fixtures are loaded and indexed up front and shared via app.state.
+    app.state.order_index = build_order_index(load_json("orders.json"))
+    await warm_up_model()
+    yield
+
+def create_app(title: str) -> FastAPI:
+    app = FastAPI(title=title, lifespan=lifespan, default_response_class=ORJSONResponse)
+
+    # Enable CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.include_router(router)
+    return app
+
+class TriageInput(BaseModel):
+    ticket_text: str
+    order_id: str | None = None
+
+# --- HELPER ENDPOINTS (Required by Boilerplate) ---
+
+router = APIRouter()
+
+@router.get("/health")
+def health(): return {"status": "ok"}
+
+@router.get("/orders/get")
+def orders_get(request: Request, order_id: str = Query(...)):
+    order = get_order_index(request).by_id.get(normalize_order_id(order_id))
+    if order: return order
+    raise HTTPException(status_code=404, detail="Order not found")
+
+@router.get("/orders/search")
+def orders_search(request: Request, customer_email: str | None = None, q: str | None = None):
+    index = get_order_index(request)
+    hits = set(index.by_email.get(customer_email.lower(), ())) if customer_email else set()
+    if q:
+        # One pass over q for all order ids/names, instead of two substring scans per order.
+        hits.update(match_orders(index.matcher, q))
+    # Fixture order, as the original single loop over the orders returned them.
+    return {"results": [index.orders[i] for i in sorted(hits)]}
+
+# Legacy endpoints (Stubbed)
+@router.post("/classify/issue")
+def classify_issue(payload: dict):
+    return {"issue_type": "unknown", "confidence": 0.1}
+
+@router.post("/reply/draft")
+def reply_draft(payload: dict):
+    return {"reply_text": "placeholder"}
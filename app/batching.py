@@ -0,0 +1,71 @@
+import asyncio
+import contextvars
+from typing import Any, List, Optional, Tuple
+
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.runnables.config import ensure_config
+
+
+class MicroBatcher:
+    """Coalesces concurrent ``ainvoke`` calls on a runnable into one ``abatch``.
+
+    Callers arriving within ``window_ms`` of each other are flushed together
+    (or as soon as ``max_batch`` is reached). With ``OLLAMA_NUM_PARALLEL`` set,
+    Ollama then schedules the whole batch on the loaded model at once instead
+    of queueing requests one by one.
+
+    Each caller's own RunnableConfig (callbacks, parent run) is captured at
+    submit time and passed per item, and the batch runs in a fresh context, so
+    tracing and ``stream_mode="messages"`` output stay with the right ticket.
+    """
+
+    def __init__(self, runnable: Runnable, window_ms: float = 0, max_batch: int = 8):
+        self.runnable = runnable
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending: List[Tuple[Any, RunnableConfig, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def ainvoke(self, inputs: Any) -> Any:
+        if self.window <= 0:
+            return await self.runnable.ainvoke(inputs)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((inputs, ensure_config(), future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            # Fresh context: the timer must not inherit the first caller's run.
+            self._timer = loop.call_later(self.window, self._flush, context=contextvars.Context())
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch), context=contextvars.Context())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, RunnableConfig, asyncio.Future]]):
+        try:
+            results = await self.runnable.abatch(
+                [inputs for inputs, _, _ in batch],
+                config=[config for _, config, _ in batch],
+                return_exceptions=True,
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
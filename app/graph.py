@@ -1,40 +1,136 @@
-import json, re
-from datetime import datetime
+import asyncio, hashlib, os, re, time
+from collections import OrderedDict
 from typing import Literal
 import logging
+import httpx
+import orjson
 from langchain_ollama import ChatOllama
-from langchain_core.messages import HumanMessage, ToolMessage, SystemMessage
-from langchain_core.tools import tool
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, SystemMessage, message_chunk_to_message
 from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
 
-from app.schema import AgentState, ClassificationOutput
-from app.utils import lookup_order, get_reply_template
+from app.batching import MicroBatcher
+from app.schema import AgentState, Classification, ISSUE_SET
+from app.utils import lookup_order, get_reply_template, render_reply_template, extract_order_id, fixture_version, match_issue_keywords, today_str
 
 logger = logging.getLogger("uvicorn.error")
 
-model = ChatOllama(model="qwen3:4b", temperature=0, keep_alive=-1)
+# Keep a warm pool of connections to Ollama instead of re-handshaking per call.
+OLLAMA_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30.0)
 
-@tool
-def fetch_order_tool(order_id: str) -> str:
-    """Retrieves order details from internal ERP system."""
-    order = lookup_order(order_id)
-    if order:
-        return json.dumps(order)
-    return f"Order ID {order_id} not found in the database."
+model = ChatOllama(
+    model="qwen3:4b",
+    temperature=0,
+    keep_alive=-1,
+    async_client_kwargs={"limits": OLLAMA_HTTP_LIMITS},
+)
+# Classification uses Ollama's native JSON mode: no tool schema injected into the
+# prompt and no pydantic round-trip, just orjson over the raw content. Bound onto
+# the same ChatOllama so both nodes share one connection pool.
+json_model = model.bind(format="json")
+# Off by default: ChatOllama.abatch is a concurrent fan-out, so a window only adds latency
+# unless Ollama is tuned for it. Set CLASSIFY_BATCH_WINDOW_MS>0 to coalesce classify calls.
+classifier = MicroBatcher(
+    json_model,
+    window_ms=float(os.getenv("CLASSIFY_BATCH_WINDOW_MS", "0")),
+    max_batch=int(os.getenv("CLASSIFY_BATCH_MAX", "8")),
+)
 
+# Bounded so an Ollama host that accepts connections but never answers can't hang startup.
+OLLAMA_WARMUP_TIMEOUT = float(os.getenv("OLLAMA_WARMUP_TIMEOUT", "60"))
 
-def classify_node(state: AgentState):
-    """Analyzes conversation history to determine issue and order ID."""
-    
-    text_to_analyze = state.get("ticket_text")
-    if not text_to_analyze and state.get("messages"):
-        for msg in reversed(state["messages"]):
-            if isinstance(msg, HumanMessage):
-                text_to_analyze = msg.content
-                break
-    
-    system_prompt = """
+async def warm_up_model():
+    """Loads and pins the model in Ollama at startup so the first ticket doesn't pay the load time."""
+    if os.getenv("OLLAMA_WARMUP", "1") == "0":
+        return
+    try:
+        # An empty prompt makes Ollama load the weights without generating anything. Goes through
+        # ChatOllama's own pooled client, so the connection is reused by the first real ticket.
+        await asyncio.wait_for(
+            model._async_client.generate(model=model.model, prompt="", keep_alive=-1),
+            timeout=OLLAMA_WARMUP_TIMEOUT,
+        )
+        logger.info(f"Model {model.model} loaded and pinned")
+    except TimeoutError:
+        logger.warning(f"Model warm-up timed out after {OLLAMA_WARMUP_TIMEOUT:g}s; continuing startup")
+    except Exception as e:
+        logger.warning(f"Model warm-up skipped: {e}")
+
+def parse_classification(content) -> Classification:
+    """Parses the JSON-mode reply; unknown issue types fall back to 'other'."""
+    try:
+        data = orjson.loads(content)
+    except (orjson.JSONDecodeError, TypeError):
+        logger.warning(f"Classifier returned non-JSON output: {content!r}")
+        return Classification(issue_type="other")
+    if not isinstance(data, dict):
+        return Classification(issue_type="other")
+
+    issue_type = data.get("issue_type")
+    order_id = data.get("order_id")
+    return Classification(
+        issue_type=issue_type if issue_type in ISSUE_SET else "other",
+        order_id=str(order_id) if order_id else None,
+    )
+
+# --- DETERMINISTIC REPLIES ---
+# A first report with a known order is answered with the filled-in standard
+# template; only follow-ups (questions, "still", "how long", ...) need the LLM.
+
+FOLLOW_UP_RE = re.compile(r"\?|\b(when|how long|how much|how soon|still|why|again|any update)\b")
+
+def _should_skip_llm(issue_type, order_id, user_input, messages) -> bool:
+    if not (issue_type and order_id and isinstance(user_input, str)):
+        return False
+    if any(isinstance(m, AIMessage) for m in messages):
+        return False
+    return FOLLOW_UP_RE.search(user_input.lower()) is None
+
+# --- REPLY CACHE ---
+# Drafts are deterministic (temperature=0) for a given issue/order/message/template,
+# so replayed tickets are answered from memory. REPLY_CACHE_SIZE=0 disables it.
+
+REPLY_CACHE_SIZE = int(os.getenv("REPLY_CACHE_SIZE", "4096"))
+CACHE_TTL = float(os.getenv("CACHE_TTL", "3600"))
+_REPLY_CACHE: OrderedDict[str, tuple[float, str]] = OrderedDict()
+
+def history_digest(messages) -> str:
+    """Digest of every turn before the latest user message; the prompt carries the whole conversation."""
+    last = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=len(messages))
+    h = hashlib.blake2b(digest_size=16)
+    for m in messages[:last]:
+        h.update(f"{m.type}\x00{m.content}\x01".encode())
+    return h.hexdigest()
+
+def reply_cache_key(issue_type, order_id, user_input, template, today, version="", history="") -> str:
+    normalized_input = " ".join(str(user_input).lower().split())
+    raw = f"{issue_type}|{order_id}|{normalized_input}|{template}|{today}|{version}|{history}"
+    return hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+def reply_cache_get(key: str):
+    entry = _REPLY_CACHE.get(key)
+    if entry is None:
+        return None
+    expires_at, reply = entry
+    if time.monotonic() > expires_at:
+        del _REPLY_CACHE[key]
+        return None
+    _REPLY_CACHE.move_to_end(key)
+    return reply
+
+def reply_cache_put(key: str, reply: str):
+    if REPLY_CACHE_SIZE <= 0 or not reply:
+        return
+    _REPLY_CACHE[key] = (time.monotonic() + CACHE_TTL, reply)
+    _REPLY_CACHE.move_to_end(key)
+    while len(_REPLY_CACHE) > REPLY_CACHE_SIZE:
+        _REPLY_CACHE.popitem(last=False)
+
+# --- PROMPTS ---
+# Static text always goes first and is sent byte-identical on every call so
+# Ollama's KV prefix cache can reuse it; per-request context is appended after.
+
+CLASSIFY_SYSTEM_PROMPT = """
     You are an expert Customer Support Triage Agent.
     Your job is to classify the user's issue into exactly one of these categories:
 
@@ -48,14 +144,57 @@ def classify_node(state: AgentState):
     - 'duplicate_charge': The user sees two charges for the same order.
     
     Extract the Order ID if present (e.g., ORD-123).
+
+    Respond with JSON only: {"issue_type": "<category, or 'other'>", "order_id": "<order id or null>"}
     """
+CLASSIFY_SYSTEM_MESSAGE = SystemMessage(content=CLASSIFY_SYSTEM_PROMPT)
+
+MISSING_ORDER_ID_PROMPT = """
+    System: You are a support agent. The user has NOT provided an Order ID.
+    Task: Ask for the Order ID politely. Do not promise a solution yet.
+    """
+
+DRAFT_REPLY_PROMPT = """
+    You are a helpful Customer Support Agent.
+
+    INSTRUCTIONS:
+    1. If the user is reporting the issue for the first time, use the "Standard Company Response" (fill in placeholders).
+    2. If the user is asking a FOLLOW-UP question (e.g., "When?", "How long?", "Is it free?"), ANSWER the question directly. Do NOT repeat the standard response.
+    3. If the user asks for a refund timeline, say "within 5 business days".
+    4. If the user asks about replacement, say "A replacement will be arranged under warranty."
+    5. If the user asks about returning a wrong item, say something like: "We will send a prepaid return label and ship the correct item."
+    6. If the Order ID was found, MENTION the item name to confirm you found the right order.
+    """
+
+def last_human(messages):
+    """Content of the most recent HumanMessage, scanning from the tail."""
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return messages[i].content
+    return None
+
+async def classify_node(state: AgentState):
+    """Analyzes conversation history to determine issue and order ID."""
     
-    messages = [SystemMessage(content=system_prompt)] + state['messages']
+    last_user_input = last_human(state.get("messages") or [])
+    text_to_analyze = state.get("ticket_text") or last_user_input
+    
+    # Unambiguous keyword + explicit order id: no need to ask the LLM.
+    if text_to_analyze:
+        keyword_issue = match_issue_keywords(text_to_analyze)
+        keyword_oid = extract_order_id(text_to_analyze) or state.get("order_id")
+        if keyword_issue and keyword_oid:
+            if logger:
+                logger.info("🧐 CLASSIFIER DECISION (keyword prefilter):")
+                logger.info(f"   -> Issue Type: {keyword_issue}")
+                logger.info(f"   -> Order ID:   {keyword_oid}")
+            return {'issue_type': keyword_issue, 'order_id': keyword_oid, 'last_user_input': last_user_input}
+
+    messages = [CLASSIFY_SYSTEM_MESSAGE] + state['messages']
 
-    structured_llm = model.with_structured_output(ClassificationOutput)
-    response = structured_llm.invoke(messages)
+    response = parse_classification((await classifier.ainvoke(messages)).content)
 
-    issue_type_str = response.issue_type.value if hasattr(response.issue_type, 'value') else response.issue_type
+    issue_type_str = response.issue_type
 
     oid = response.order_id
     if oid:
@@ -64,9 +203,7 @@ def classify_node(state: AgentState):
             oid = None
             
     if not oid and text_to_analyze:
-        match = re.search(r"(ORD[-\s]?\d+)", text_to_analyze, re.IGNORECASE)
-        if match:
-            oid = match.group(1).upper().replace(" ", "").replace("-", "")
+        oid = extract_order_id(text_to_analyze)
 
     if not oid:
         oid = state.get("order_id")
@@ -79,65 +216,83 @@ def classify_node(state: AgentState):
     return {
         'issue_type': issue_type_str,
         'order_id': oid,
+        'last_user_input': last_user_input,
         # 'evidence': response.evidence
     }
 
-def fetch_order_node(state: AgentState):
-    """Executes the tool and appends result to history."""
+def summarize_order(order: dict) -> str:
+    """Only the fields the reply needs, as plain text rather than a JSON dump."""
+    items = ", ".join(item.get("name", item.get("sku", "")) for item in order.get("items", []))
+    summary = f"Order {order['order_id']} found for {order.get('customer_name')} - items: {items or 'n/a'}; status: {order.get('status')}"
+    if order.get("delivery_date"):
+        summary += f"; delivery date: {order['delivery_date']}"
+    return summary
+
+async def fetch_order_node(state: AgentState):
+    """Looks up the order, keeps it structured in state and appends a short summary to history."""
     order_id = state.get('order_id')
-    
-    tool_result = fetch_order_tool.invoke(str(order_id))
-    
+    order = lookup_order(order_id)
+    content = summarize_order(order) if order else f"Order ID {order_id} not found in the database."
+
     return {
+        "order": order,
         "messages": [
             ToolMessage(
-                content=str(tool_result),
+                content=content,
                 name='fetch_order',
                 tool_call_id=f"call_{order_id}"
             )
         ]
     }
 
-def draft_reply_node(state: AgentState):
+async def draft_reply_node(state: AgentState):
     """Generates the final response based on context."""
 
     issue_type = state.get("issue_type")
     order_id = state.get("order_id")
     
-    user_input = "Unknown"
-    for msg in reversed(state["messages"]):
-        if isinstance(msg, HumanMessage):
-            user_input = msg.content
-            break
-    today = datetime.utcnow().strftime("%Y-%m-%d")
+    # Found once by classify_node, which always runs first.
+    user_input = state.get("last_user_input") or "Unknown"
+    today = today_str()
+    template = get_reply_template(issue_type) if order_id else ""
+
+    if _should_skip_llm(issue_type, order_id, user_input, state["messages"]):
+        # fetch_order_node always runs before this when there is an order_id.
+        order = state.get("order")
+        if order:
+            return {"messages": [AIMessage(content=render_reply_template(template, order))]}
+
+    # Editing orders.json/replies.json changes the version, so stale drafts stop matching.
+    version = fixture_version("orders.json", "replies.json")
+    # Different prior turns ending in the same follow-up must not share a reply.
+    history = history_digest(state["messages"])
+    cache_key = reply_cache_key(issue_type, order_id, user_input, template, today, version, history)
+    cached_reply = reply_cache_get(cache_key)
+    if cached_reply is not None:
+        return {"messages": [AIMessage(content=cached_reply)]}
+
     if not order_id:
-        prompt = f"""
-        System: You are a support agent. User has a '{issue_type}' issue but NO Order ID.
-        Context: {user_input}
-        Task: Ask for the Order ID politely. Do not promise a solution yet.
-        Today's Date: {today}
-        """
+        prompt = f"""{MISSING_ORDER_ID_PROMPT}
+    CONTEXT:
+    - Issue Type: {issue_type}
+    - User Message: {user_input}
+    Today's Date: {today}
+    """
     else:
-        template = get_reply_template(issue_type) if order_id else "N/A"
-        prompt = f"""
-        You are a helpful Customer Support Agent.
-        
-        CONTEXT:
-        - Issue Type: {issue_type}
-        - Order ID: {order_id or "Not Provided"}
-        - Standard Company Response: "{template}"
-        
-        INSTRUCTIONS:
-        1. If the user is reporting the issue for the first time, use the "Standard Company Response" (fill in placeholders).
-        2. If the user is asking a FOLLOW-UP question (e.g., "When?", "How long?", "Is it free?"), ANSWER the question directly. Do NOT repeat the standard response.
-        3. If the user asks for a refund timeline, say "within 5 business days".
-        4. If the user asks about replacement, say "A replacement will be arranged under warranty."
-        5. If the user asks about returning a wrong item, say something like: "We will send a prepaid return label and ship the correct item."
-        6. If the Order ID was found, MENTION the item name to confirm you found the right order.
-        Today's Date: {today}
-        """
+        prompt = f"""{DRAFT_REPLY_PROMPT}
+    CONTEXT:
+    - Issue Type: {issue_type}
+    - Order ID: {order_id}
+    - Standard Company Response: "{template}"
+    Today's Date: {today}
+    """
     messages = [SystemMessage(content=prompt)] + state["messages"]
-    response = model.invoke(messages)
+    # Streamed so graph.astream(stream_mode="messages") can forward tokens as they arrive.
+    chunks = None
+    async for chunk in model.astream(messages):
+        chunks = chunk if chunks is None else chunks + chunk
+    response = message_chunk_to_message(chunks) if chunks is not None else AIMessage(content="")
+    reply_cache_put(cache_key, response.content)
     return {"messages": [response]}
 
 # --- ROUTING ---
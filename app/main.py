@@ -1,90 +1,27 @@
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import json, os, re
-import uuid
+from fastapi import HTTPException, Request
+from sse_starlette.sse import EventSourceResponse
+import orjson, uuid
 
+from app.api import TriageInput as BaseTriageInput, create_app, get_order_index
 from app.graph import graph
-from app.utils import lookup_order
-
-app = FastAPI(title="Phase 1 Mock API")
-
-# Enable CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# --- BOILERPLATE DATA LOADING (Kept for compatibility) ---
-ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
-MOCK_DIR = os.path.join(ROOT, "mock_data") # Or "data", depending on your folder setup
-
-def load(name):
-    # Robust path finding
-    paths = [
-        os.path.join(MOCK_DIR, name),
-        os.path.join(ROOT, "data", name),
-        os.path.join(ROOT, "..", "data", name)
-    ]
-    for p in paths:
-        if os.path.exists(p):
-            with open(p, "r", encoding="utf-8") as f:
-                return json.load(f)
-    return [] # Return empty if not found to prevent crash
-
-ORDERS = load("orders.json")
-ISSUES = load("issues.json")
-REPLIES = load("replies.json")
-
-class TriageInput(BaseModel):
-    ticket_text: str
-    order_id: str | None = None
-    # Add an optional conversation_id if the client supports it
-    conversation_id: str | None = None 
-
-# --- HELPER ENDPOINTS (Required by Boilerplate) ---
-
-@app.get("/health")
-def health(): return {"status": "ok"}
-
-@app.get("/orders/get")
-def orders_get(order_id: str = Query(...)):
-    for o in ORDERS:
-        if o["order_id"] == order_id: return o
-    raise HTTPException(status_code=404, detail="Order not found")
-
-@app.get("/orders/search")
-def orders_search(customer_email: str | None = None, q: str | None = None):
-    matches = []
-    for o in ORDERS:
-        if customer_email and o["email"].lower() == customer_email.lower():
-            matches.append(o)
-        elif q and (o["order_id"].lower() in q.lower() or o["customer_name"].lower() in q.lower()):
-            matches.append(o)
-    return {"results": matches}
+from app.utils import lookup_order, extract_order_id
 
-# Legacy endpoints (Stubbed)
-@app.post("/classify/issue")
-def classify_issue(payload: dict):
-    return {"issue_type": "unknown", "confidence": 0.1}
+app = create_app("Phase 1 Mock API")
 
-@app.post("/reply/draft")
-def reply_draft(payload: dict):
-    return {"reply_text": "placeholder"}
+class TriageInput(BaseTriageInput):
+    # Add an optional conversation_id if the client supports it
+    conversation_id: str | None = None 
 
 
 # --- THE SMART AI ENDPOINT ---
 
-@app.post("/triage/invoke")
-async def triage_invoke(body: TriageInput):
+async def run_triage(request: Request, body: TriageInput):
     """
     Executes the Unified Graph with Memory Persistence.
+    Yields ("token", text) for each reply chunk as it is generated, then ("result", payload).
     """
     ticket_text = body.ticket_text
     explicit_oid = body.order_id
@@ -100,9 +37,7 @@ async def triage_invoke(body: TriageInput):
         thread_id = explicit_oid
     if not thread_id:
         # Try to find ID in text to use as thread anchor
-        m = re.search(r"(ORD[-\s]?\d+)", ticket_text, re.IGNORECASE)
-        if m:
-            thread_id = m.group(1).upper().replace(" ", "").replace("-", "")
+        thread_id = extract_order_id(ticket_text)
     
     if not thread_id:
         thread_id = str(uuid.uuid4()) # Fallback: No memory persistence across calls if no ID found
@@ -115,14 +50,17 @@ async def triage_invoke(body: TriageInput):
     if explicit_oid:
         inputs["order_id"] = explicit_oid
 
-    # 3. RUN GRAPH (Async)
+    # 3. RUN GRAPH (Async, streaming reply tokens)
     config = {"configurable": {"thread_id": thread_id}}
-    
-    try:
-        final_state = await graph.ainvoke(inputs, config=config)
-    except Exception as e:
-        # Fallback for unexpected AI errors
-        raise HTTPException(status_code=500, detail=f"Agent Error: {str(e)}")
+
+    final_state = None
+    async for mode, chunk in graph.astream(inputs, config=config, stream_mode=["messages", "values"]):
+        if mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") == "draft_reply" and message.content:
+                yield "token", message.content
+        else:
+            final_state = chunk
 
     # 4. FORMAT OUTPUT (Matching the Boilerplate Schema)
     
@@ -138,15 +76,39 @@ async def triage_invoke(body: TriageInput):
     # Hydrate Order Object (Required by Boilerplate)
     full_order = None
     if agent_oid:
-        full_order = next((o for o in ORDERS if o["order_id"] == agent_oid), None)
+        full_order = lookup_order(agent_oid, index=get_order_index(request).by_id)
 
-    return {
+    yield "result", {
         "order_id": agent_oid,
         "issue_type": agent_issue,
         "order": full_order,
         "reply_text": reply_text
     }
 
+@app.post("/triage/invoke")
+async def triage_invoke(request: Request, body: TriageInput):
+    result = None
+    try:
+        async for event, data in run_triage(request, body):
+            if event == "result":
+                result = data
+    except Exception as e:
+        # Fallback for unexpected AI errors
+        raise HTTPException(status_code=500, detail=f"Agent Error: {str(e)}")
+    return result
+
+@app.post("/triage/stream")
+async def triage_stream(request: Request, body: TriageInput):
+    """Same as /triage/invoke, but streams reply tokens as SSE 'token' events before the final 'result'."""
+    async def events():
+        try:
+            async for event, data in run_triage(request, body):
+                yield {"event": event, "data": data if event == "token" else orjson.dumps(data).decode()}
+        except Exception as e:
+            yield {"event": "error", "data": f"Agent Error: {str(e)}"}
+
+    return EventSourceResponse(events())
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,39 +1,158 @@
-import json
+import re
+import time
+from datetime import datetime, timezone
+from collections import defaultdict
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Callable, Optional, Dict, Any, List, Tuple
+
+import ahocorasick
+import orjson
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "mock_data"
 
+# filename -> (mtime, parsed data). Re-parsed only when the file changes on disk.
+_JSON_CACHE: Dict[str, Tuple[float, Any]] = {}
+
 def load_json(filename: str) -> List[Dict]:
     file_path = DATA_DIR / filename
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
+        mtime = file_path.stat().st_mtime
     except FileNotFoundError:
         print(f"Warning: {filename} not found at {file_path}")
         return []
 
-def lookup_order(order_id: str) -> Optional[Dict[str, Any]]:
+    cached = _JSON_CACHE.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(file_path, 'rb') as f:
+        data = orjson.loads(f.read())
+    _JSON_CACHE[filename] = (mtime, data)
+    return data
+
+# (filename, build function) -> (parsed data it was built from, built value).
+_DERIVED_CACHE: Dict[Tuple[str, Callable], Tuple[Any, Any]] = {}
+
+def _derived(filename: str, build: Callable[[Any], Any]) -> Any:
+    """`build(load_json(filename))`, rebuilt only when load_json hands back a freshly parsed list."""
+    data = load_json(filename)
+    cached = _DERIVED_CACHE.get((filename, build))
+    if cached is None or cached[0] is not data:
+        cached = (data, build(data))
+        _DERIVED_CACHE[(filename, build)] = cached
+    return cached[1]
+
+def fixture_version(*filenames: str) -> str:
+    """mtimes of the given fixtures as currently loaded; changes whenever one is re-parsed."""
+    for filename in filenames:
+        load_json(filename)
+    return ":".join(str(_JSON_CACHE.get(filename, (0.0,))[0]) for filename in filenames)
+
+# Explicit case classes instead of re.IGNORECASE keeps matching on the plain path.
+ORDER_ID_RE = re.compile(r"([Oo][Rr][Dd][-\s]?\d+)")
+
+# Drops '-' and ' ' in a single C-level pass.
+_ORDER_ID_STRIP = str.maketrans('', '', '- ')
+
+def normalize_order_id(order_id: str) -> str:
+    return str(order_id).translate(_ORDER_ID_STRIP).upper()
+
+def extract_order_id(text: str) -> Optional[str]:
+    """Returns the first ORD-style id found in free text, normalized, or None."""
+    match = ORDER_ID_RE.search(text)
+    return normalize_order_id(match.group(1)) if match else None
+
+def index_orders(orders: List[Dict]) -> Tuple[Dict[str, Dict], Dict[str, List[int]]]:
+    """Builds (by normalized order_id -> order, by lowercased email -> order indices) in one pass."""
+    by_id: Dict[str, Dict] = {}
+    by_email: Dict[str, List[int]] = defaultdict(list)
+    for i, order in enumerate(orders):
+        by_id[normalize_order_id(order.get('order_id', ''))] = order
+        if order.get('email'):
+            by_email[order['email'].lower()].append(i)
+    return by_id, dict(by_email)
+
+def build_order_matcher(orders: List[Dict]) -> Optional[ahocorasick.Automaton]:
+    """Builds one Aho-Corasick automaton over every lowercased order_id and customer_name.
+
+    Each key's payload is the tuple of indices of the orders it belongs to, so one pass over
+    the text reports every order whose id or name occurs in it, overlapping keys included.
+    """
+    owners: Dict[str, List[int]] = defaultdict(list)
+    for i, order in enumerate(orders):
+        for field in ("order_id", "customer_name"):
+            key = str(order.get(field) or "").lower()
+            if key and i not in owners[key]:
+                owners[key].append(i)
+
+    if not owners:
+        return None  # an automaton with no keys can't be searched
+    automaton = ahocorasick.Automaton()
+    for key, idxs in owners.items():
+        automaton.add_word(key, tuple(idxs))
+    automaton.make_automaton()
+    return automaton
+
+def match_orders(matcher: Optional[ahocorasick.Automaton], text: str) -> List[int]:
+    """Indices (in source order) of orders whose id or customer name appears in `text`."""
+    if matcher is None or not text:
+        return []
+    return sorted({i for _, idxs in matcher.iter(text.lower()) for i in idxs})
+
+def _orders_by_id(orders: List[Dict]) -> Dict[str, Dict]:
+    return index_orders(orders)[0]
+
+def lookup_order(order_id: str, index: Optional[Dict[str, Dict]] = None) -> Optional[Dict[str, Any]]:
+    """Finds an order by id. Pass a prebuilt `index` (e.g. get_order_index(request).by_id) to skip the file cache."""
     if not order_id: 
         return None
-    
-    db = load_json("orders.json")
-    clean_id = str(order_id).replace('-', '').replace(' ', '').upper()
+    if index is None:
+        index = _derived("orders.json", _orders_by_id)
+    return index.get(normalize_order_id(order_id))
 
-    for order in db:
-        db_id = str(order.get('order_id', '')).replace('-', '').replace(' ', '').upper()
-        if db_id == clean_id:
-            return order
-    return None
+DEFAULT_REPLY_TEMPLATE = "Hi {{customer_name}}, regarding order {{order_id}}: We are looking into your issue."
 
-def get_reply_template(issue_type: str) -> str:
-    replies = load_json("replies.json")
+def _reply_templates(replies: List[Dict]) -> Dict[str, str]:
+    # First entry wins, matching the original linear scan.
+    templates: Dict[str, str] = {}
     for item in replies:
-        if item.get("issue_type") == issue_type:
-            return item["template"]
-    return "Hi {{customer_name}}, regarding order {{order_id}}: We are looking into your issue."
+        templates.setdefault(item.get("issue_type"), item["template"])
+    return templates
+
+def get_reply_template(issue_type: str) -> str:
+    return _derived("replies.json", _reply_templates).get(issue_type, DEFAULT_REPLY_TEMPLATE)
+
+def render_reply_template(template: str, order: Dict[str, Any]) -> str:
+    return (
+        template.replace("{{customer_name}}", str(order.get("customer_name", "there")))
+        .replace("{{order_id}}", str(order.get("order_id", "")))
+    )
 
 def get_issue_types()->List[str]:
     issue_mappings = load_json("issues.json")
-    return [item["issue_type"] for item in issue_mappings]+['other']
\ No newline at end of file
+    return [item["issue_type"] for item in issue_mappings]+['other']
+
+def _keyword_matcher(issue_mappings: List[Dict]) -> Tuple[Dict[str, str], Optional[re.Pattern]]:
+    keyword_to_issue = {item["keyword"].lower(): item["issue_type"] for item in issue_mappings}
+    # One alternation, longest keyword first, so the input is scanned a single time.
+    keywords = sorted(keyword_to_issue, key=len, reverse=True)
+    pattern = re.compile(r"\b(" + "|".join(map(re.escape, keywords)) + r")\b") if keywords else None
+    return keyword_to_issue, pattern
+
+def match_issue_keywords(text: str) -> Optional[str]:
+    """Returns the issue type if the text's issues.json keywords all agree on one, else None."""
+    keyword_to_issue, pattern = _derived("issues.json", _keyword_matcher)
+    if not text or pattern is None:
+        return None
+    matched = {keyword_to_issue[kw] for kw in pattern.findall(text.lower())}
+    return matched.pop() if len(matched) == 1 else None
+
+# UTC date string, refreshed at most once a minute.
+_TODAY_CACHE = {"date": "", "expiry": 0.0}
+
+def today_str() -> str:
+    now = time.time()
+    if now > _TODAY_CACHE["expiry"]:
+        _TODAY_CACHE.update(date=datetime.now(timezone.utc).strftime("%Y-%m-%d"), expiry=now + 60)
+    return _TODAY_CACHE["date"]
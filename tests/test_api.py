@@ -0,0 +1,58 @@
+import os
+import shutil
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+
+import app.utils as utils
+from app.api import create_app
+from app.utils import load_json
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setenv("OLLAMA_WARMUP", "0")
+    shutil.copytree(utils.DATA_DIR, tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "DATA_DIR", tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "_JSON_CACHE", {})
+    with TestClient(create_app("test")) as client:
+        yield client
+
+
+def baseline_search(orders, customer_email=None, q=None):
+    """The original per-order loop behind /orders/search."""
+    matches = []
+    for o in orders:
+        if customer_email and o["email"].lower() == customer_email.lower():
+            matches.append(o)
+        elif q and (o["order_id"].lower() in q.lower() or o["customer_name"].lower() in q.lower()):
+            matches.append(o)
+    return matches
+
+
+@pytest.mark.parametrize("params", [
+    {"customer_email": "carlos.gomez@example.com", "q": "ORD1001"},
+    {"customer_email": "Ava.Chen@example.com", "q": "david lee and ord1003"},
+    {"customer_email": "nobody@example.com", "q": "Carlos Gomez"},
+    {"customer_email": "carlos.gomez@example.com"},
+    {"q": "ord1006 ord1001"},
+])
+def test_orders_search_matches_baseline_order(client, params):
+    expected = [o["order_id"] for o in baseline_search(load_json("orders.json"), **params)]
+    results = client.get("/orders/search", params=params).json()["results"]
+    assert [o["order_id"] for o in results] == expected
+
+
+def test_edited_orders_json_is_picked_up_without_restart(client):
+    path = utils.DATA_DIR / "orders.json"
+    orders = orjson.loads(path.read_bytes())
+    orders[0]["customer_name"] = "Renamed Customer"
+    path.write_bytes(orjson.dumps(orders))
+    mtime = path.stat().st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+    order = client.get("/orders/get", params={"order_id": orders[0]["order_id"]}).json()
+    assert order["customer_name"] == "Renamed Customer"
+    results = client.get("/orders/search", params={"q": "renamed customer"}).json()["results"]
+    assert [o["order_id"] for o in results] == [orders[0]["order_id"]]
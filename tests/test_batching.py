@@ -0,0 +1,105 @@
+import asyncio
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+import app.graph as graph_module
+from app.batching import MicroBatcher
+
+
+class CountingRunnable:
+    """Wraps a RunnableLambda and records the size of every abatch call."""
+
+    def __init__(self, func):
+        self.inner = RunnableLambda(func)
+        self.batch_sizes = []
+
+    async def ainvoke(self, inputs, config=None):
+        return await self.inner.ainvoke(inputs, config)
+
+    async def abatch(self, inputs, config=None, return_exceptions=False):
+        self.batch_sizes.append(len(inputs))
+        return await self.inner.abatch(inputs, config, return_exceptions=return_exceptions)
+
+
+class EchoChatModel(BaseChatModel):
+    """Answers the classifier with the last user message as the order id."""
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        text = [m for m in messages if isinstance(m, HumanMessage)][-1].content
+        content = f'{{"issue_type": "other", "order_id": "{text.split()[-1]}"}}'
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def test_window_flushes_concurrent_calls_together():
+    runnable = CountingRunnable(lambda x: x * 2)
+    batcher = MicroBatcher(runnable, window_ms=10, max_batch=8)
+
+    async def run():
+        return await asyncio.gather(*[batcher.ainvoke(i) for i in range(3)])
+
+    assert asyncio.run(run()) == [0, 2, 4]
+    assert runnable.batch_sizes == [3]
+
+
+def test_max_batch_flushes_early():
+    runnable = CountingRunnable(lambda x: x + 1)
+    batcher = MicroBatcher(runnable, window_ms=10, max_batch=4)
+
+    async def run():
+        return await asyncio.gather(*[batcher.ainvoke(i) for i in range(6)])
+
+    assert asyncio.run(run()) == [1, 2, 3, 4, 5, 6]
+    assert runnable.batch_sizes == [4, 2]
+
+
+def test_exceptions_are_delivered_per_item():
+    def maybe_fail(x):
+        if x == 1:
+            raise ValueError("boom")
+        return x
+
+    batcher = MicroBatcher(CountingRunnable(maybe_fail), window_ms=10)
+
+    async def run():
+        return await asyncio.gather(*[batcher.ainvoke(i) for i in range(3)], return_exceptions=True)
+
+    ok0, err, ok2 = asyncio.run(run())
+    assert (ok0, ok2) == (0, 2)
+    assert isinstance(err, ValueError)
+
+
+def test_zero_window_invokes_directly():
+    runnable = CountingRunnable(lambda x: x)
+    batcher = MicroBatcher(runnable, window_ms=0)
+
+    assert asyncio.run(batcher.ainvoke(5)) == 5
+    assert runnable.batch_sizes == []
+
+
+def test_batched_classify_output_stays_with_its_own_run(monkeypatch):
+    monkeypatch.setattr(graph_module, "classifier", MicroBatcher(EchoChatModel(), window_ms=20))
+    monkeypatch.setattr(graph_module, "model", FakeListChatModel(responses=["reply"] * 10))
+
+    async def run(ticket):
+        seen = []
+        inputs = {"ticket_text": ticket, "messages": [("user", ticket)]}
+        async for message, metadata in graph_module.graph.astream(inputs, stream_mode="messages"):
+            if metadata.get("langgraph_node") == "classify":
+                seen.append(message.content)
+        return seen
+
+    async def both():
+        return await asyncio.gather(run("hello ORD-1001"), run("hello ORD-1002"))
+
+    seen_a, seen_b = asyncio.run(both())
+    assert seen_a and all("ORD-1001" in c for c in seen_a)
+    assert seen_b and all("ORD-1002" in c for c in seen_b)
+
@@ -0,0 +1,76 @@
+import asyncio
+from collections import OrderedDict
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
+
+import app.graph as graph_module
+from app.utils import lookup_order, render_reply_template
+
+
+class RecordingModel:
+    """Stands in for the draft LLM and records every prompt it is sent."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def astream(self, messages):
+        self.calls.append(messages)
+        yield AIMessageChunk(content="llm reply")
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    model = RecordingModel()
+    monkeypatch.setattr(graph_module, "model", model)
+    monkeypatch.setattr(graph_module, "_REPLY_CACHE", OrderedDict())
+    return model
+
+
+def draft(text, order_id="ORD1001", issue_type="refund_request", history=()):
+    order = lookup_order(order_id)
+    state = {
+        "issue_type": issue_type,
+        "order_id": order_id,
+        "order": order,
+        "last_user_input": text,
+        "messages": [*history, HumanMessage(text), ToolMessage(content="summary", tool_call_id="call_1")],
+    }
+    return asyncio.run(graph_module.draft_reply_node(state))["messages"][-1].content
+
+
+def test_first_report_with_known_order_renders_template_without_llm(llm):
+    reply = draft("I want a refund for ORD1001")
+    assert llm.calls == []
+    assert reply == (
+        "Hi Ava Chen, we are sorry for the inconvenience. "
+        "We reviewed order ORD1001 and a refund will be processed shortly."
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "Refund ORD1001 - when will I get it?",
+    "I'm still waiting on my refund for ORD1001",
+    "How long does a refund for ORD1001 take",
+])
+def test_follow_up_cues_go_to_llm(llm, text):
+    assert draft(text) == "llm reply"
+    assert len(llm.calls) == 1
+
+
+def test_earlier_ai_turn_goes_to_llm(llm):
+    history = [HumanMessage("I want a refund"), AIMessage("Could you share your order id?")]
+    assert draft("It's ORD1001", history=history) == "llm reply"
+    assert len(llm.calls) == 1
+
+
+def test_unknown_order_goes_to_llm(llm):
+    assert draft("Refund for ORD9999 please", order_id="ORD9999") == "llm reply"
+    assert len(llm.calls) == 1
+
+
+def test_render_reply_template_fills_placeholders():
+    template = "Hi {{customer_name}}, about {{order_id}} ({{order_id}})."
+    order = {"customer_name": "Ava Chen", "order_id": "ORD1001"}
+    assert render_reply_template(template, order) == "Hi Ava Chen, about ORD1001 (ORD1001)."
+    assert render_reply_template(template, {}) == "Hi there, about  ()."
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import orjson
+import pytest
+
+import app.utils as utils
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    shutil.copytree(utils.DATA_DIR, tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "DATA_DIR", tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "_JSON_CACHE", {})
+    monkeypatch.setattr(utils, "_DERIVED_CACHE", {})
+    return tmp_path / "mock_data"
+
+
+def rewrite(path, edit):
+    data = orjson.loads(path.read_bytes())
+    edit(data)
+    path.write_bytes(orjson.dumps(data))
+    mtime = path.stat().st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+
+def test_derived_values_are_built_once_per_parse(data_dir):
+    calls = []
+
+    def count_orders(orders):
+        calls.append(orders)
+        return len(orders)
+
+    total = utils._derived("orders.json", count_orders)
+    assert utils._derived("orders.json", count_orders) == total
+    assert len(calls) == 1
+
+    rewrite(data_dir / "orders.json", lambda orders: orders.pop())
+    assert utils._derived("orders.json", count_orders) == total - 1
+    assert len(calls) == 2
+
+
+def test_lookup_order_sees_edited_orders(data_dir):
+    assert utils.lookup_order("ORD-1001")["customer_name"] == "Ava Chen"
+    rewrite(data_dir / "orders.json", lambda orders: orders[0].update(customer_name="Renamed"))
+    assert utils.lookup_order("ORD-1001")["customer_name"] == "Renamed"
+
+
+def test_reply_template_sees_edited_replies(data_dir):
+    issue_type = orjson.loads((data_dir / "replies.json").read_bytes())[0]["issue_type"]
+    rewrite(data_dir / "replies.json", lambda replies: replies[0].update(template="Edited {{order_id}}"))
+    assert utils.get_reply_template(issue_type) == "Edited {{order_id}}"
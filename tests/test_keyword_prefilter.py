@@ -0,0 +1,66 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+import app.graph as graph_module
+from app.utils import match_issue_keywords
+
+
+class RecordingClassifier:
+    """Stands in for the batched JSON-mode classifier and records every call."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def ainvoke(self, messages):
+        self.calls.append(messages)
+        return AIMessage(content='{"issue_type": "other", "order_id": null}')
+
+
+@pytest.fixture
+def classifier(monkeypatch):
+    classifier = RecordingClassifier()
+    monkeypatch.setattr(graph_module, "classifier", classifier)
+    return classifier
+
+
+def classify(text, **state):
+    return asyncio.run(graph_module.classify_node({"messages": [HumanMessage(text)], **state}))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I want a REFUND", "refund_request"),
+    ("my parcel is late and not arrived", "late_delivery"),
+    ("it came broken, totally damaged", "damaged_item"),
+    ("I was charged twice", "duplicate_charge"),
+    ("the lateral side is scratched", None),  # "late" only as a whole word
+    ("I want a refund, it came broken", None),
+    ("", None),
+])
+def test_match_issue_keywords(text, expected):
+    assert match_issue_keywords(text) == expected
+
+
+def test_keyword_and_order_id_skip_the_llm(classifier):
+    result = classify("Refund please for ord-1001")
+    assert classifier.calls == []
+    assert result["issue_type"] == "refund_request"
+    assert result["order_id"] == "ORD1001"
+
+
+def test_order_id_from_earlier_turn_counts(classifier):
+    result = classify("package is late", order_id="ORD1002")
+    assert classifier.calls == []
+    assert (result["issue_type"], result["order_id"]) == ("late_delivery", "ORD1002")
+
+
+def test_conflicting_keywords_go_to_llm(classifier):
+    classify("Refund ORD1001, it arrived broken")
+    assert len(classifier.calls) == 1
+
+
+@pytest.mark.parametrize("text", ["I want a refund", "my headphones stopped ORD1001"])
+def test_missing_keyword_or_order_id_goes_to_llm(classifier, text):
+    classify(text)
+    assert len(classifier.calls) == 1
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from app.utils import build_order_matcher, load_json, match_orders
+
+# Overlapping keys: "ann" sits inside "anna", and "nna b" straddles a longer name.
+OVERLAPPING = [
+    {"order_id": "X1", "customer_name": "Ann"},
+    {"order_id": "X12", "customer_name": "Anna"},
+    {"order_id": "Y", "customer_name": "nna b"},
+]
+
+
+def naive_match(orders, text):
+    text = text.lower()
+    return [
+        i for i, o in enumerate(orders)
+        if o["order_id"].lower() in text or o["customer_name"].lower() in text
+    ]
+
+
+def random_queries(orders, n, seed=0):
+    rng = random.Random(seed)
+    keys = [o[f] for o in orders for f in ("order_id", "customer_name")]
+    noise = ["", " ", "a", "n", "b", "x", "1", "2", "ord", "please", "refund for", "-"]
+    for _ in range(n):
+        parts = []
+        for _ in range(rng.randint(0, 5)):
+            piece = rng.choice(keys) if rng.random() < 0.5 else rng.choice(noise)
+            if piece and rng.random() < 0.3:
+                # Truncate so queries also contain near-misses of real keys.
+                piece = piece[: rng.randint(1, len(piece))]
+            if rng.random() < 0.5:
+                piece = piece.upper()
+            parts.append(piece)
+        yield rng.choice(["", " "]).join(parts)
+
+
+def test_ann_inside_anna_matches_both():
+    matcher = build_order_matcher(OVERLAPPING)
+    assert match_orders(matcher, "this is for Anna") == naive_match(OVERLAPPING, "this is for Anna") == [0, 1]
+    assert match_orders(matcher, "ANNA B here") == [0, 1, 2]
+    assert match_orders(matcher, "hi ann") == [0]
+
+
+@pytest.mark.parametrize("orders", [
+    pytest.param(load_json("orders.json"), id="fixture"),
+    pytest.param(load_json("orders.json") + OVERLAPPING, id="fixture+overlapping"),
+])
+def test_matcher_agrees_with_naive_scan(orders):
+    matcher = build_order_matcher(orders)
+    for query in random_queries(orders, 3000):
+        assert match_orders(matcher, query) == naive_match(orders, query), query
+
+
+def test_empty_inputs():
+    assert match_orders(build_order_matcher([]), "anything") == []
+    assert match_orders(build_order_matcher(OVERLAPPING), "") == []
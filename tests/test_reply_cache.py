@@ -0,0 +1,77 @@
+import asyncio
+import os
+import shutil
+from collections import OrderedDict
+
+import pytest
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+
+import app.graph as graph_module
+import app.utils as utils
+
+STATE = {
+    "issue_type": "refund_request",
+    "order_id": None,
+    "last_user_input": "I want my money back",
+    "messages": [HumanMessage("I want my money back")],
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(graph_module, "_REPLY_CACHE", OrderedDict())
+    shutil.copytree(utils.DATA_DIR, tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "DATA_DIR", tmp_path / "mock_data")
+    monkeypatch.setattr(utils, "_JSON_CACHE", {})
+
+
+class ScriptedModel:
+    """Streams each scripted reply as a single chunk, one reply per call."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    async def astream(self, messages):
+        yield AIMessageChunk(content=self.responses.pop(0))
+
+
+def draft(state=STATE):
+    result = asyncio.run(graph_module.draft_reply_node(state))
+    return result["messages"][-1].content
+
+
+def test_repeat_ticket_is_served_from_cache(monkeypatch):
+    monkeypatch.setattr(graph_module, "model", ScriptedModel(["first", "second"]))
+    assert draft() == "first"
+    assert draft() == "first"
+
+
+def test_empty_reply_is_not_cached(monkeypatch):
+    monkeypatch.setattr(graph_module, "model", ScriptedModel(["", "real"]))
+    assert draft() == ""
+    assert draft() == "real"
+
+
+def test_fixture_change_invalidates_cached_reply(monkeypatch):
+    monkeypatch.setattr(graph_module, "model", ScriptedModel(["old", "new"]))
+    assert draft() == "old"
+
+    orders = utils.DATA_DIR / "orders.json"
+    mtime = orders.stat().st_mtime + 10
+    os.utime(orders, (mtime, mtime))
+    assert draft() == "new"
+
+
+def test_same_follow_up_in_different_conversations_is_not_shared(monkeypatch):
+    monkeypatch.setattr(graph_module, "model", ScriptedModel(["reply for A", "reply for B"]))
+
+    def conversation(first_turn, first_reply):
+        return {
+            "issue_type": "late_delivery",
+            "order_id": None,
+            "last_user_input": "When will I get it?",
+            "messages": [HumanMessage(first_turn), AIMessage(first_reply), HumanMessage("When will I get it?")],
+        }
+
+    assert draft(conversation("My parcel is late", "Sorry, which order?")) == "reply for A"
+    assert draft(conversation("I was charged twice", "Sorry, which order?")) == "reply for B"
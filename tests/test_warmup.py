@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+import app.graph as graph_module
+
+
+class HangingClient:
+    """Accepts the request and never answers, like a wedged Ollama host."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, **kwargs):
+        self.calls.append(kwargs)
+        await asyncio.Event().wait()
+
+
+def test_warm_up_gives_up_after_timeout(monkeypatch, caplog):
+    client = HangingClient()
+    monkeypatch.setenv("OLLAMA_WARMUP", "1")
+    monkeypatch.setattr(graph_module, "OLLAMA_WARMUP_TIMEOUT", 0.05)
+    monkeypatch.setattr(graph_module.model, "_async_client", client)
+
+    with caplog.at_level(logging.WARNING, logger="uvicorn.error"):
+        asyncio.run(asyncio.wait_for(graph_module.warm_up_model(), timeout=5))
+
+    assert client.calls == [{"model": graph_module.model.model, "prompt": "", "keep_alive": -1}]
+    assert "timed out" in caplog.text
+
+
+def test_warm_up_can_be_disabled(monkeypatch):
+    client = HangingClient()
+    monkeypatch.setenv("OLLAMA_WARMUP", "0")
+    monkeypatch.setattr(graph_module.model, "_async_client", client)
+    asyncio.run(graph_module.warm_up_model())
+    assert client.calls == []